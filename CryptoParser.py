@@ -1,43 +1,141 @@
 import websocket
 import json
+import sys
 import threading
+import queue
 import requests
 from typing import Dict, List, Set
 import time
 import math
+import heapq
+from collections import OrderedDict
+from array import array
+from operator import itemgetter
 import logging
+import atexit
+from logging.handlers import QueueHandler, QueueListener
 import telebot
 from telebot.types import Message
 
-# Настройка логирования
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    handlers=[
-        logging.FileHandler("bot.log"),
-        logging.StreamHandler()
-    ]
-)
+try:
+    import orjson
+except ImportError:  # orjson не установлен - используем стандартный json
+    orjson = None
+
+# Быстрый (де)сериализатор для потока WebSocket; json_dumps может вернуть bytes
+if orjson is not None:
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+else:
+    json_loads = json.loads
+    json_dumps = json.dumps
+
+def format_json(data) -> str:
+    """Форматирует данные для вывода в консоль с отступами"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
+# Настройка логирования: потоки WebSocket и бота только кладут записи в очередь,
+# форматирование и запись в файл/консоль выполняет отдельный поток QueueListener
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+log_handlers = [logging.FileHandler("bot.log"), logging.StreamHandler()]
+for log_handler in log_handlers:
+    log_handler.setFormatter(log_formatter)
+
+log_queue = queue.Queue(-1)
+log_listener = QueueListener(log_queue, *log_handlers)
+log_listener.start()
+atexit.register(log_listener.stop)  # Дописываем оставшиеся в очереди записи при выходе
+
+root_logger = logging.getLogger()
+root_logger.setLevel(logging.INFO)
+root_logger.addHandler(QueueHandler(log_queue))
 logger = logging.getLogger(__name__)
 
+# Общая HTTP-сессия: соединение с api.bybit.com переиспользуется между запросами.
+# requests сам запрашивает gzip (и br, если установлен brotli) и распаковывает ответ
+http_session = requests.Session()
+
+# URL для WebSocket Bybit
+WS_URL = "wss://stream.bybit.com/v5/public/spot"
+WS_CONNECTIONS = 4  # Сколько соединений держим на все тикеры
+SUBSCRIBE_BATCH_SIZE = 10  # Лимит Bybit на число тикеров в одной подписке (спот)
+PING_INTERVAL = 20  # Bybit рекомендует ping каждые 20 секунд
+PING_MESSAGE = json_dumps({"op": "ping"})
+# Без проверки UTF-8 (см. start_websocket) websocket-client отдает текстовые кадры в on_message как bytes,
+# поэтому маркеры для маршрутизации тоже bytes
+TICKER_MESSAGE_PREFIX = b'{"topic":"tickers.'  # Начало каждого сообщения с данными тикера
+SUBSCRIBE_ACK_MARKER = b'"op":"subscribe"'  # Есть только в ответах на подписку
+STANDBY_CONNECTIONS = 2  # Сколько резервных соединений держим открытыми
+RECONNECT_DELAY = 1  # Пауза перед открытием нового соединения (секунды)
+MAX_USER_REQUESTS = 10_000  # Сколько последних пользователей помним для статистики
+
+# Запись одного ключа в dict атомарна под GIL, поэтому горячий путь пишет без блокировки.
+# В free-threaded сборках (PEP 703) GIL может быть выключен - там берем блокировку
+GIL_ENABLED = getattr(sys, '_is_gil_enabled', lambda: True)()
+DATA_SHARDS = 16  # Число шардов current_data (степень двойки)
+
+# Поля тикера Bybit, которые храним; itemgetter достает их одним вызовом на C
+TICKER_FIELDS = ('symbol', 'lastPrice', 'price24hPcnt', 'highPrice24h', 'lowPrice24h', 'volume24h')
+TICKER_DEFAULTS = dict.fromkeys(TICKER_FIELDS, 'N/A')
+extract_ticker_fields = itemgetter(*TICKER_FIELDS)
+
+class TickerRow:
+    """Компактная запись тикера - храним только поля, которые отдаем пользователю"""
+    __slots__ = ('symbol', 'last_price', 'price_change_24h', 'high_price_24h',
+                 'low_price_24h', 'volume_24h', 'ts')
+    
+    def __init__(self, symbol, last_price, price_change_24h, high_price_24h, low_price_24h, volume_24h, ts):
+        self.symbol = symbol
+        self.last_price = last_price
+        self.price_change_24h = price_change_24h
+        self.high_price_24h = high_price_24h
+        self.low_price_24h = low_price_24h
+        self.volume_24h = volume_24h
+        self.ts = ts
+    
+    @classmethod
+    def from_payload(cls, item: dict, ts) -> 'TickerRow':
+        """Создает запись из тикера Bybit; ts берется из самого сообщения"""
+        try:
+            fields = extract_ticker_fields(item)
+        except KeyError:
+            # В снимке не хватает полей - подставляем N/A
+            fields = extract_ticker_fields({**TICKER_DEFAULTS, **item})
+        return cls(*fields, ts)
+
 class BybitDataCollector:
     def __init__(self):
-        self.current_data = {}
+        # current_data разбит на шарды по hash(symbol), у каждого шарда своя блокировка
+        self.current_data = [{} for _ in range(DATA_SHARDS)]
+        self.shard_locks = [threading.Lock() for _ in range(DATA_SHARDS)]
         self.ws_connections = []
         self.is_connected = False
         self.lock = threading.Lock()
         self.available_tickers = set()
         self.subscribed_tickers = set()
+        self.ticker_index = {}  # короткое имя (BTC) -> тикер (BTCUSDT)
+        self.shard_ids = {}  # тикер -> номер шарда, считается один раз
+        # Колоночное хранилище для аналитики: тикер -> номер строки в колонках
+        self.row_index = {}
+        self.row_symbols = []
+        self.change_24h = array('d')
+        self.render_cache = {}  # тикер -> (TickerRow, готовый ответ); не больше одной записи на тикер
         self.total_batches = 0
-        self.completed_batches = 0
-        self.user_requests = {}  # Для логирования запросов пользователей
+        self.all_ready = threading.Event()  # Все батчи подтверждены Bybit
+        self.pending_batches = {}  # req_id -> батч, ожидающий подтверждения подписки
+        self.subscribe_payloads = {}  # req_id -> готовое сообщение подписки
+        self.ws_batches = {}  # соединение -> батчи, на которые оно подписано
+        self.standby_ws = []  # открытые соединения без подписок (не больше STANDBY_CONNECTIONS), под self.lock
+        self.user_requests = OrderedDict()  # Для логирования запросов пользователей (LRU)
         
     def fetch_spot_tickers(self) -> List[str]:
         """Получаем список всех спотовых тикетов с Bybit"""
         try:
             url = "https://api.bybit.com/v5/market/instruments-info"
             params = {"category": "spot"}
-            response = requests.get(url, params=params)
+            response = http_session.get(url, params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -63,98 +161,301 @@ class BybitDataCollector:
             batches.append(tickers[i:i + batch_size])
         return batches
     
-    def start_websocket_for_batch(self, batch: List[str], batch_id: int):
-        """Запускает WebSocket подключение для одного батча тикетов"""
-        
-        def on_message(ws, message):
-            try:
-                data = json.loads(message)
-                
-                # Пропускаем сообщения о подписке
-                if 'success' in data and data['success']:
-                    return
-                
-                # Обрабатываем данные тикера
-                if 'topic' in data and 'tickers' in data['topic']:
-                    ticker_data = data['data']
-                    if isinstance(ticker_data, dict):
-                        symbol = ticker_data.get('symbol')
-                        if symbol:
-                            with self.lock:
-                                self.current_data[symbol] = ticker_data
-                    elif isinstance(ticker_data, list):
-                        for item in ticker_data:
-                            symbol = item.get('symbol')
-                            if symbol:
-                                with self.lock:
-                                    self.current_data[symbol] = item
-                            
-            except Exception as e:
-                # Тихий режим - не выводим ошибки
-                pass
-        
-        def on_error(ws, error):
+    @property
+    def completed_batches(self) -> int:
+        """Сколько батчей уже подтверждено (каждое подтверждение убирает батч из pending_batches)"""
+        # Пока start_all_websockets публикует pending_batches и total_batches, разность может быть меньше нуля
+        return max(self.total_batches - len(self.pending_batches), 0)
+    
+    @staticmethod
+    def shard(symbol: str) -> int:
+        """Номер шарда current_data для тикера"""
+        return hash(symbol) & (DATA_SHARDS - 1)
+    
+    def shard_id(self, symbol: str) -> int:
+        """Номер шарда тикера: заранее посчитанный для списка инструментов, иначе вычисляется"""
+        shard_id = self.shard_ids.get(symbol)
+        if shard_id is None:
+            shard_id = self.shard(symbol)
+        return shard_id
+    
+    def handle_message(self, ws, message):
+        """Разбирает входящее сообщение любого из соединений"""
+        try:
+            # Кадры приходят как bytes; str приводим к bytes, чтобы маршрутизация работала всегда
+            if type(message) is str:
+                message = message.encode()
+            
+            # Bybit всегда начинает данные тикеров с поля topic - маршрутизируем по префиксу
+            if message.startswith(TICKER_MESSAGE_PREFIX):
+                data = json_loads(message)
+                ticker_data = data['data']
+                ts = data.get('ts')
+                if type(ticker_data) is dict:
+                    symbol = ticker_data.get('symbol')
+                    if symbol:
+                        shard_id = self.shard_id(symbol)
+                        row = TickerRow.from_payload(ticker_data, ts)
+                        if GIL_ENABLED:
+                            self.current_data[shard_id][symbol] = row
+                        else:
+                            with self.shard_locks[shard_id]:
+                                self.current_data[shard_id][symbol] = row
+                        self.update_columns(row)
+                elif isinstance(ticker_data, list) and ticker_data:
+                    rows = [TickerRow.from_payload(item, ts) for item in ticker_data if item.get('symbol')]
+                    if GIL_ENABLED:
+                        for row in rows:
+                            self.current_data[self.shard_id(row.symbol)][row.symbol] = row
+                    else:
+                        # Одна блокировка на шард за сообщение, а не на каждый тикер
+                        by_shard = {}
+                        for row in rows:
+                            by_shard.setdefault(self.shard_id(row.symbol), []).append(row)
+                        for shard_id, shard_rows in by_shard.items():
+                            with self.shard_locks[shard_id]:
+                                shard = self.current_data[shard_id]
+                                for row in shard_rows:
+                                    shard[row.symbol] = row
+                    for row in rows:
+                        self.update_columns(row)
+                return
+            
+            # Служебные сообщения (pong и т.п.) пропускаем, не разбирая JSON
+            if SUBSCRIBE_ACK_MARKER not in message:
+                return
+            
+            # Подтверждение подписки - батч считается подключенным
+            data = json_loads(message)
+            batch = self.pending_batches.pop(data.get('req_id'), None)
+            if batch is None:
+                return
+            if data.get('success'):
+                self.subscribed_tickers.update(batch)
+                self.index_tickers(batch)
+            else:
+                logger.warning(f"Ошибка подписки на батч {data.get('req_id')}: {data.get('ret_msg')}")
+            
+            # pop() выше атомарен и с GIL, и без него - отдельный счетчик под блокировкой не нужен
+            if not self.pending_batches:
+                self.all_ready.set()
+            
+            logger.info(f"Батч {data.get('req_id')}/{self.total_batches} подключен: {len(batch)} тикеров")
+                        
+        except Exception as e:
             # Тихий режим - не выводим ошибки
             pass
-        
-        def on_close(ws, close_status_code, close_msg):
+    
+    def handle_error(self, ws, error):
+        # Тихий режим - не выводим ошибки
+        pass
+    
+    def handle_close(self, ws, close_status_code, close_msg):
+        with self.lock:
             # Убираем соединение из списка
-            with self.lock:
-                if ws in self.ws_connections:
-                    self.ws_connections.remove(ws)
+            if ws in self.ws_connections:
+                self.ws_connections.remove(ws)
+            batches = self.ws_batches.pop(ws, None)
         
-        def on_open(ws):
-            # Подписываемся на тикеры в этом батче
-            subscribe_message = {
-                "op": "subscribe",
-                "args": [f"tickers.{ticker}" for ticker in batch]
-            }
-            
-            ws.send(json.dumps(subscribe_message))
-            self.subscribed_tickers.update(batch)
-            
+        if batches:
+            # Активное соединение упало - переносим его подписки на резервное
+            logger.warning(f"Соединение закрыто ({close_status_code}), переподписываем {len(batches)} батчей")
+            self.failover(batches)
+        else:
+            # Упало резервное соединение - убираем его из резерва, чтобы тот не копил мертвые сокеты
             with self.lock:
-                self.completed_batches += 1
-            
-            print(f"✅ Батч {batch_id}/{self.total_batches} подключен: {len(batch)} тикеров")
-            logger.info(f"Батч {batch_id}/{self.total_batches} подключен: {len(batch)} тикеров")
-        
-        # URL для WebSocket Bybit
-        ws_url = "wss://stream.bybit.com/v5/public/spot"
+                if ws in self.standby_ws:
+                    self.standby_ws.remove(ws)
+                need_standby = len(self.standby_ws) < STANDBY_CONNECTIONS
+            # Лишнее соединение (не влезшее в резерв) не заменяем
+            if need_standby:
+                self.schedule(self.start_standby)
+    
+    def handle_open(self, ws):
+        batches = self.ws_batches.get(ws)
+        if batches is None:
+            # Резервное соединение: рукопожатие выполнено, ждем в резерве без подписок
+            with self.lock:
+                is_surplus = len(self.standby_ws) >= STANDBY_CONNECTIONS
+                if not is_surplus:
+                    self.standby_ws.append(ws)
+            if is_surplus:
+                ws.close()
+            return
         
+        self.subscribe(ws, batches)
+        print(f"✅ Соединение открыто: {len(batches)} батчей")
+        logger.info(f"Соединение открыто: {len(batches)} батчей")
+    
+    def subscribe(self, ws, batches: Dict[str, List[str]]):
+        """Отправляет все подписки соединения подряд, без задержек"""
+        for req_id in batches:
+            ws.send(self.subscribe_payloads[req_id])
+    
+    def start_websocket(self, batches: Dict[str, List[str]] = None):
+        """Запускает одно WebSocket подключение; без батчей оно уходит в резерв"""
         ws = websocket.WebSocketApp(
-            ws_url,
-            on_open=on_open,
-            on_message=on_message,
-            on_error=on_error,
-            on_close=on_close
+            WS_URL,
+            on_open=self.handle_open,
+            on_message=self.handle_message,
+            on_error=self.handle_error,
+            on_close=self.handle_close
         )
         
         # Добавляем соединение в список
-        with self.lock:
-            self.ws_connections.append(ws)
-        
-        # Запускаем WebSocket в отдельном потоке
-        def run_ws():
-            ws.run_forever()
+        if batches is not None:
+            with self.lock:
+                self.ws_connections.append(ws)
+                self.ws_batches[ws] = batches
         
-        ws_thread = threading.Thread(target=run_ws)
+        # Каждое соединение читается своим потоком; все они пишут в один сборщик.
+        # Проверка UTF-8 в websocket-client идет побайтово на Python - для JSON от Bybit она не нужна.
+        # Без нее текстовые кадры не декодируются: on_message получает bytes, а не str
+        ws_thread = threading.Thread(target=ws.run_forever, kwargs={'skip_utf8_validation': True})
         ws_thread.daemon = True
         ws_thread.start()
     
+    def start_standby(self):
+        """Заранее открывает резервное соединение, чтобы не ждать TLS и рукопожатия при сбое"""
+        self.start_websocket()
+    
+    def schedule(self, callback):
+        """Выполняет callback с паузой RECONNECT_DELAY, чтобы не долбить Bybit при сбоях сети"""
+        timer = threading.Timer(RECONNECT_DELAY, callback)
+        timer.daemon = True
+        timer.start()
+    
+    def failover(self, batches: Dict[str, List[str]]):
+        """Переносит подписки упавшего соединения на резервное или открывает новое"""
+        while True:
+            with self.lock:
+                ws = self.standby_ws.pop(0) if self.standby_ws else None
+            if ws is None:
+                # Резерва нет - открываем новое соединение, оно подпишется в handle_open
+                self.schedule(lambda: self.start_websocket(batches))
+                return
+            
+            try:
+                self.subscribe(ws, batches)
+            except Exception:
+                # Резервное соединение уже мертво - заменяем его с паузой и пробуем следующее
+                self.schedule(self.start_standby)
+                continue
+            
+            # Регистрируем соединение только после успешной подписки, иначе handle_close
+            # мертвого резерва запустил бы второй failover для тех же батчей
+            with self.lock:
+                self.ws_connections.append(ws)
+                self.ws_batches[ws] = batches
+            if ws.sock is not None and ws.sock.connected:
+                break
+            
+            # Соединение закрылось до регистрации - его handle_close мог не увидеть батчи.
+            # Кто первым заберет батчи из ws_batches, тот и переносит их дальше
+            with self.lock:
+                owned = self.ws_batches.pop(ws, None) is not None
+                if ws in self.ws_connections:
+                    self.ws_connections.remove(ws)
+            if not owned:
+                return
+            self.schedule(self.start_standby)
+        
+        logger.info(f"Батчи перенесены на резервное соединение: {len(batches)}")
+        self.start_standby()
+    
+    def ping_loop(self):
+        """Отправляет ping во все соединения - Bybit закрывает молчащие сокеты"""
+        while True:
+            time.sleep(PING_INTERVAL)
+            # Резервные соединения тоже должны пинговаться, иначе Bybit их закроет
+            with self.lock:
+                connections = self.ws_connections + self.standby_ws
+            for ws in connections:
+                try:
+                    ws.send(PING_MESSAGE)
+                except Exception:
+                    pass
+    
     def start_all_websockets(self, tickers: List[str]):
         """Запускает WebSocket подключения для всех батчей"""
-        # Создаем батчи по 10 тикетов
-        batches = self.create_batches(tickers, 10)
+        # Bybit принимает не более 10 тикеров в одном сообщении подписки для спота
+        batches = self.create_batches(tickers, SUBSCRIBE_BATCH_SIZE)
+        # Сначала батчи, потом их число: в промежутке прогресс читается как 0/0, а не N/N
+        self.pending_batches = {str(i + 1): batch for i, batch in enumerate(batches)}
         self.total_batches = len(batches)
         
-        print(f"🔄 Создано {self.total_batches} батчей для подключения...")
-        logger.info(f"Создано {self.total_batches} батчей для подключения")
+        # Сообщения подписки собираем один раз - при переподключении отправляем те же байты
+        self.subscribe_payloads = {
+            req_id: json_dumps({
+                "req_id": req_id,
+                "op": "subscribe",
+                "args": [f"tickers.{ticker}" for ticker in batch]
+            })
+            for req_id, batch in self.pending_batches.items()
+        }
         
-        # Запускаем подключения с задержкой между ними
-        for i, batch in enumerate(batches):
-            self.start_websocket_for_batch(batch, i + 1)
-            time.sleep(0.2)  # Задержка между подключениями
+        # Распределяем батчи по небольшому числу соединений
+        req_ids = list(self.pending_batches)
+        shards = [req_ids[i::WS_CONNECTIONS] for i in range(WS_CONNECTIONS)]
+        shards = [shard for shard in shards if shard]
+        
+        print(f"🔄 Создано {self.total_batches} батчей для {len(shards)} соединений...")
+        logger.info(f"Создано {self.total_batches} батчей для {len(shards)} соединений")
+        
+        for i, shard in enumerate(shards):
+            shard_batches = {req_id: self.pending_batches[req_id] for req_id in shard}
+            self.start_websocket(shard_batches)
+        
+        for _ in range(STANDBY_CONNECTIONS):
+            self.start_standby()
+        
+        ping_thread = threading.Thread(target=self.ping_loop)
+        ping_thread.daemon = True
+        ping_thread.start()
+    
+    def index_tickers(self, tickers: List[str]):
+        """Добавляет подписанные тикеры в индекс коротких имен для find_ticker"""
+        for ticker in tickers:
+            # Пара к USDT всегда приоритетнее частичного совпадения
+            if ticker.endswith('USDT'):
+                self.ticker_index[ticker[:-4]] = ticker
+            else:
+                self.ticker_index.setdefault(ticker.replace('USDT', ''), ticker)
+    
+    def allocate_columns(self, tickers: List[str]):
+        """Заранее выделяет строки колоночного хранилища и номера шардов под все тикеры"""
+        self.shard_ids = {ticker: self.shard(ticker) for ticker in tickers}
+        self.row_symbols = list(tickers)
+        self.row_index = {ticker: i for i, ticker in enumerate(self.row_symbols)}
+        self.change_24h = array('d', [-math.inf]) * len(self.row_symbols)
+    
+    def update_columns(self, row: TickerRow):
+        """Обновляет колонки по свежей записи тикера"""
+        i = self.row_index.get(row.symbol)
+        if i is None:
+            return
+        try:
+            self.change_24h[i] = float(row.price_change_24h)
+        except (TypeError, ValueError):
+            # 'N/A' или null от Bybit - колонку не трогаем
+            pass
+    
+    def get_top_movers(self, limit: int = 10) -> List[dict]:
+        """Возвращает тикеры с наибольшим ростом за 24h"""
+        change = self.change_24h
+        top = heapq.nlargest(limit, range(len(change)), key=change.__getitem__)
+        result = []
+        for i in top:
+            if change[i] == -math.inf:
+                break
+            symbol = self.row_symbols[i]
+            row = self.current_data[self.shard(symbol)].get(symbol)
+            result.append({
+                'symbol': symbol,
+                'last_price': row.last_price if row is not None else 'N/A',
+                'price_change_percent_24h': f"{change[i] * 100:.2f}%"
+            })
+        return result
     
     def find_ticker(self, user_input: str) -> str:
         """Находит правильное название тикера по пользовательскому вводу"""
@@ -163,17 +464,9 @@ class BybitDataCollector:
         # Прямое совпадение
         if user_input in self.subscribed_tickers:
             return user_input
-            
-        # Пробуем добавить USDT если его нет
-        if not user_input.endswith('USDT') and f"{user_input}USDT" in self.subscribed_tickers:
-            return f"{user_input}USDT"
-            
-        # Ищем частичное совпадение
-        for ticker in self.subscribed_tickers:
-            if user_input == ticker.replace('USDT', ''):
-                return ticker
-                
-        return user_input
+        
+        # Короткое имя: BTC -> BTCUSDT и т.п.
+        return self.ticker_index.get(user_input, user_input)
     
     def log_user_request(self, user_id: str, username: str, message: str, source: str = "TG"):
         """Логирует запросы пользователей"""
@@ -181,7 +474,7 @@ class BybitDataCollector:
         print(f"👤 {log_message}")
         logger.info(log_message)
         
-        # Сохраняем последние запросы для статистики
+        # Сохраняем последние запросы для статистики, самых давних пользователей вытесняем
         with self.lock:
             self.user_requests[user_id] = {
                 'username': username,
@@ -189,6 +482,14 @@ class BybitDataCollector:
                 'timestamp': time.time(),
                 'source': source
             }
+            self.user_requests.move_to_end(user_id)
+            if len(self.user_requests) > MAX_USER_REQUESTS:
+                self.user_requests.popitem(last=False)
+    
+    def get_user_requests(self) -> List[tuple]:
+        """Возвращает снимок последних запросов пользователей"""
+        with self.lock:
+            return list(self.user_requests.items())
     
     def get_ticker_data(self, symbol: str, user_id: str = None, username: str = None, source: str = "TG") -> dict:
         """Мгновенно возвращает актуальные данные по тикеру"""
@@ -199,25 +500,30 @@ class BybitDataCollector:
         # Находим правильное название тикера
         correct_symbol = self.find_ticker(symbol)
         
-        with self.lock:
-            data = self.current_data.get(correct_symbol)
+        row = self.current_data[self.shard(correct_symbol)].get(correct_symbol)
         
-        if data:
+        if row is not None:
+            # Пока запись тикера не обновилась, отдаем уже отформатированный ответ
+            cached = self.render_cache.get(correct_symbol)
+            if cached is not None and cached[0] is row:
+                return cached[1]
+            
             # Форматируем красивые данные
             result = {
-                'symbol': data.get('symbol', 'N/A'),
-                'last_price': data.get('lastPrice', 'N/A'),
-                'price_change_24h': data.get('price24hPcnt', 'N/A'),
-                'high_price_24h': data.get('highPrice24h', 'N/A'),
-                'low_price_24h': data.get('lowPrice24h', 'N/A'),
-                'volume_24h': data.get('volume24h', 'N/A'),
-                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(data.get('ts', 0)/1000)) if data.get('ts') else 'N/A'
+                'symbol': row.symbol,
+                'last_price': row.last_price,
+                'price_change_24h': row.price_change_24h,
+                'high_price_24h': row.high_price_24h,
+                'low_price_24h': row.low_price_24h,
+                'volume_24h': row.volume_24h,
+                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(int(row.ts)/1000)) if row.ts else 'N/A'
             }
             
             # Добавляем процент изменения
             if result['price_change_24h'] != 'N/A':
                 result['price_change_percent_24h'] = f"{float(result['price_change_24h']) * 100:.2f}%"
             
+            self.render_cache[correct_symbol] = (row, result)
             return result
         else:
             return {
@@ -233,7 +539,7 @@ class BybitDataCollector:
             return {
                 "available_tickers": len(self.available_tickers),
                 "subscribed_tickers": len(self.subscribed_tickers),
-                "current_data": len(self.current_data),
+                "current_data": sum(len(shard) for shard in self.current_data),
                 "active_connections": len(self.ws_connections),
                 "batch_progress": f"{self.completed_batches}/{self.total_batches}",
                 "user_requests_count": len(self.user_requests)
@@ -255,13 +561,13 @@ class BybitDataCollector:
         logger.info(f"Подключаемся ко всем {len(tickers)} тикетам")
         
         # Запускаем все WebSocket подключения
+        self.allocate_columns(tickers)
         self.start_all_websockets(tickers)
         
-        # Ждем завершения подключения всех батчей
-        while self.completed_batches < self.total_batches:
+        # Ждем подтверждения всех батчей, раз в 2 секунды показываем прогресс
+        while not self.all_ready.wait(2):
             stats = self.get_stats()
             print(f"⏳ Прогресс: {stats['batch_progress']} батчей | Подписано тикетов: {stats['subscribed_tickers']}")
-            time.sleep(2)
         
         print("\n" + "="*60)
         print("✅ ВСЕ ТИКЕТЫ ПОДПИСАНЫ!")
@@ -294,6 +600,7 @@ class TelegramBot:
                 "Я бот для отслеживания криптовалютных пар с Bybit в реальном времени.\n\n"
                 "📊 Доступные команды:\n"
                 "/ticker [symbol] - получить данные по тикеру (например: /ticker BTC или /ticker ETHUSDT)\n"
+                "/top - лидеры роста за 24h\n"
                 "/stats - статистика системы\n"
                 "/help - помощь\n\n"
                 "Просто напиши название тикера (BTC, ETH, ADA и т.д.) и я покажу актуальные данные!"
@@ -310,6 +617,8 @@ class TelegramBot:
                 "   • Бот автоматически добавит USDT если нужно\n\n"
                 "📊 Статистика системы:\n"
                 "   • /stats - покажет сколько тикетов отслеживается\n\n"
+                "🚀 Лидеры роста:\n"
+                "   • /top - 10 тикеров с наибольшим ростом за 24h\n\n"
                 "🔄 Данные обновляются в реальном времени через WebSocket\n"
                 "⚡ Ответ мгновенный - данные уже в памяти"
             )
@@ -330,6 +639,19 @@ class TelegramBot:
             )
             self.bot.reply_to(message, stats_text)
         
+        @self.bot.message_handler(commands=['top'])
+        def top_handler(message: Message):
+            top = self.data_collector.get_top_movers(10)
+            if not top:
+                self.bot.reply_to(message, "⏳ Данных пока нет, попробуйте позже")
+                return
+            
+            lines = [
+                f"{i}. {item['symbol']}: {item['price_change_percent_24h']} (цена {item['last_price']})"
+                for i, item in enumerate(top, 1)
+            ]
+            self.bot.reply_to(message, "🚀 ЛИДЕРЫ РОСТА ЗА 24h:\n\n" + "\n".join(lines))
+        
         @self.bot.message_handler(commands=['ticker'])
         def ticker_command_handler(message: Message):
             user = message.from_user
@@ -380,7 +702,8 @@ class TelegramBot:
         try:
             print("🤖 Telegram бот запускается...")
             logger.info("Запуск Telegram бота")
-            self.bot.infinity_polling(timeout=60, long_polling_timeout=60)
+            # Боту нужны только сообщения - остальные типы обновлений Telegram не присылает
+            self.bot.infinity_polling(timeout=60, long_polling_timeout=60, allowed_updates=['message'])
         except Exception as e:
             print(f"❌ Ошибка запуска Telegram бота: {e}")
             logger.error(f"Ошибка запуска Telegram бота: {e}")
@@ -441,7 +764,7 @@ def main():
                 if user_input:
                     data = collector.get_ticker_data(user_input, "console", "ConsoleUser", "CONSOLE")
                     print(f"\n📊 Данные для {user_input}:")
-                    print(json.dumps(data, indent=2, ensure_ascii=False))
+                    print(format_json(data))
                     
             elif choice == '2':
                 stats = collector.get_stats()
@@ -455,7 +778,7 @@ def main():
                 
             elif choice == '3':
                 print(f"\n👤 Последние запросы пользователей:")
-                for user_id, request_data in collector.user_requests.items():
+                for user_id, request_data in collector.get_user_requests():
                     time_ago = time.time() - request_data['timestamp']
                     print(f"   • {request_data['username']} ({user_id}) [{request_data['source']}]: {request_data['last_request']} ({int(time_ago)} сек. назад)")
                 